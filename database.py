@@ -5,11 +5,12 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import Iterable, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -22,11 +23,11 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    _client = AsyncIOMotorClient(database_url)
     db = _client[database_name]
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -40,10 +41,36 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
+async def bulk_create_documents(collection_name: str, docs: Iterable[Union[BaseModel, dict]], flat: bool = False):
+    """Insert many documents with timestamps in a single round-trip
+
+    Pass flat=True when the models have no nested models: their field dict is
+    copied directly instead of going through model_dump().
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    now = datetime.now(timezone.utc)
+    requests = []
+    for data in docs:
+        if isinstance(data, BaseModel):
+            data_dict = dict(data.__dict__) if flat else data.model_dump()
+        else:
+            data_dict = data.copy()
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        requests.append(InsertOne(data_dict))
+
+    if not requests:
+        return 0
+
+    result = await db[collection_name].bulk_write(requests, ordered=False)
+    return result.inserted_count
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
     """Get documents from collection"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -52,4 +79,11 @@ def get_documents(collection_name: str, filter_dict: dict = None, limit: int = N
     if limit:
         cursor = cursor.limit(limit)
     
-    return list(cursor)
+    return await cursor.to_list(length=None)
+
+def get_documents_projected(collection_name: str, filter_dict: dict = None, projection: dict = None, batch_size: int = 500):
+    """Get a cursor over documents, returning only projected fields, fetched in batches"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    return db[collection_name].find(filter_dict or {}, projection).batch_size(batch_size)
@@ -1,13 +1,31 @@
 import os
-from typing import List, Dict
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import List, Dict, Tuple
+import numpy as np
+import orjson
+from fastapi import BackgroundTasks, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
-from database import db, create_document, get_documents
+try:
+    from numba import njit
+except ImportError:  # e.g. platforms without numba wheels; fall back to NumPy
+    njit = None
+
+from database import db, create_document, bulk_create_documents, get_documents_projected
 from schemas import FinancialProfile, Transaction, AnalysisRequest, Alert, AnalysisResult
 
-app = FastAPI(title="Financial Protection AI Agent")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Financial Protection AI Agent", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,13 +35,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Alert lists repeat the same keys and strings, so they compress well even at level 1
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
+
+@app.on_event("startup")
+def compile_kernels():
+    # Numba compiles on first call; do it here rather than inside a request on the event loop
+    if njit is not None:
+        warm_sum_outflows()
+
+async def ensure_indexes():
+    """Ensure lookup indexes exist; create_index is a no-op when they already do"""
+    try:
+        await db["alert"].create_index([("user_email", 1), ("alert_type", 1)])
+    except Exception:
+        # Queries still work without the index, just with a collection scan
+        logger.exception("Could not create alert indexes")
+
+_index_task = None
+
+@app.on_event("startup")
+async def create_indexes():
+    # Run in the background so an unreachable database doesn't hold up startup
+    # for the whole server-selection timeout
+    global _index_task
+    if db is not None:
+        _index_task = asyncio.create_task(ensure_indexes())
+
+@app.on_event("shutdown")
+async def cancel_index_creation():
+    # Don't let the loop close with create_index still pending
+    if _index_task is not None and not _index_task.done():
+        _index_task.cancel()
+        try:
+            await _index_task
+        except asyncio.CancelledError:
+            pass
+
 @app.get("/")
 def read_root():
     return {"message": "Financial Protection AI Agent Backend"}
 
-@app.get("/test")
-def test_database():
-    """Test endpoint to check if database is available and accessible"""
+# /test may be polled by health checks; reuse the last status for this many seconds
+TEST_CACHE_TTL = 30.0
+_test_cache = {"t": 0.0, "resp": None}
+
+# Concurrent misses share one refresh instead of each querying Mongo
+_test_cache_lock = asyncio.Lock()
+
+def _test_cache_fresh():
+    return _test_cache["resp"] is not None and time.monotonic() - _test_cache["t"] < TEST_CACHE_TTL
+
+async def check_database():
+    """Build the /test status payload; may wait on Mongo server selection"""
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -39,7 +103,7 @@ def test_database():
             response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await db.list_collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -53,9 +117,114 @@ def test_database():
     response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
     return response
 
+@app.get("/test")
+async def test_database():
+    """Test endpoint to check if database is available and accessible"""
+    if _test_cache_fresh():
+        return _test_cache["resp"]
+
+    async with _test_cache_lock:
+        # Another probe may have refreshed the status while this one waited
+        if not _test_cache_fresh():
+            response = await check_database()
+            # Stamp after the check so a slow (timed-out) check doesn't store an already-expired entry
+            _test_cache["t"] = time.monotonic()
+            _test_cache["resp"] = response
+        return _test_cache["resp"]
+
+# Helper: aggregate outflows overall and per category
+
+# Below this size building the arrays costs more than the Python loop saves
+VECTORIZE_MIN_TRANSACTIONS = 256
+
+def aggregate_spending(transactions: List[Transaction]) -> Tuple[float, Dict[str, float]]:
+    if len(transactions) <= VECTORIZE_MIN_TRANSACTIONS:
+        category_totals = defaultdict(float)
+        total_debits = 0.0
+        for t in transactions:
+            amt = t.amount
+            # Convention: positive = outflow
+            if amt > 0:
+                total_debits += amt
+                cat = t.category
+                if cat:
+                    category_totals[cat] += amt
+        # Plain dict so both paths return the same type and reads never insert
+        return total_debits, dict(category_totals)
+
+    # Intern categories to small int ids; id 0 is reserved for uncategorized
+    cat_index: Dict[str, int] = {"": 0}
+    cat_ids = np.fromiter(
+        (cat_index.setdefault(t.category or "", len(cat_index)) for t in transactions),
+        dtype=np.int64, count=len(transactions),
+    )
+    amts = np.fromiter((t.amount for t in transactions), dtype=np.float64, count=len(transactions))
+    total_debits, sums = _sum_outflows(amts, cat_ids, len(cat_index))
+    category_totals = {name: float(sums[i]) for name, i in cat_index.items() if name and sums[i] > 0}
+    return float(total_debits), category_totals
+
+def _sum_outflows_numpy(amts, cat_ids, n_cats):
+    outflows = np.where(amts > 0, amts, 0.0)
+    return outflows.sum(), np.bincount(cat_ids, weights=outflows, minlength=n_cats)
+
+def _sum_outflows_loop(amts, cat_ids, n_cats):
+    total = 0.0
+    sums = np.zeros(n_cats)
+    for i in range(amts.size):
+        a = amts[i]
+        if a > 0:
+            total += a
+            sums[cat_ids[i]] += a
+    return total, sums
+
+# cache=True persists the compiled kernel so only the first boot pays for compilation
+_sum_outflows = njit(cache=True)(_sum_outflows_loop) if njit is not None else _sum_outflows_numpy
+
+def warm_sum_outflows():
+    """Compile the JIT kernel before serving, with the same argument types as real calls"""
+    _sum_outflows(np.zeros(1, dtype=np.float64), np.zeros(1, dtype=np.int64), 1)
+
 # Helper: compute protection score and alerts
 
+# Static parts of alerts; only user_email and data vary per request
+_MISSING_HEALTH = {"alert_type": "missing_health_insurance", "severity": "high",
+                   "message": "Health insurance not detected."}
+_MISSING_RENTERS = {"alert_type": "missing_renters_insurance", "severity": "medium",
+                    "message": "Renter's/home insurance not detected."}
+_MISSING_AUTO = {"alert_type": "missing_auto_insurance", "severity": "medium",
+                 "message": "Auto insurance not detected."}
+_MISSING_LIFE = {"alert_type": "missing_life_insurance", "severity": "high",
+                 "message": "Life insurance recommended when you have dependents."}
+
+# Bit i of the missing-insurance mask selects _INSURANCE_TEMPLATES[i]
+_INSURANCE_TEMPLATES = (_MISSING_HEALTH, _MISSING_RENTERS, _MISSING_AUTO, _MISSING_LIFE)
+_MISSING_AUTO_BIT = 1 << 2
+_MISSING_LIFE_BIT = 1 << 3
+
+_OVERSPENDING = {"alert_type": "overspending", "severity": "medium",
+                 "message": "Recent spending exceeds monthly income by more than 10%."}
+
+@dataclass(slots=True)
+class _AlertLite:
+    """Unvalidated alert built by the analyzer; converted to Alert once at the end"""
+    user_email: str
+    alert_type: str
+    severity: str
+    message: str
+    data: dict
+
+    def to_alert(self) -> Alert:
+        # Fields come from the analyzer itself, so validation can be skipped
+        return Alert.model_construct(
+            user_email=self.user_email,
+            alert_type=self.alert_type,
+            severity=self.severity,
+            message=self.message,
+            data=self.data,
+        )
+
 def analyze_financial_protection(profile: FinancialProfile, transactions: List[Transaction]):
+    # Figures are left at full precision; present_analysis rounds them for the API
     income = profile.monthly_income
     expenses = profile.monthly_expenses
     savings = profile.savings
@@ -66,72 +235,42 @@ def analyze_financial_protection(profile: FinancialProfile, transactions: List[T
     burn_rate_months = (savings / expenses) if expenses > 0 else 12.0
 
     # Category spending from provided transactions
-    category_totals: Dict[str, float] = {}
-    total_debits = 0.0
-    for t in transactions:
-        amt = t.amount
-        # Convention: positive = outflow
-        if amt > 0:
-            total_debits += amt
-            if t.category:
-                category_totals[t.category] = category_totals.get(t.category, 0) + amt
-
-    alerts: List[Alert] = []
+    total_debits, category_totals = aggregate_spending(transactions)
+
+    alerts: List[_AlertLite] = []
 
     # Emergency fund alert
     target_months = 3 if profile.risk_tolerance == "high" else 6 if profile.risk_tolerance == "medium" else 9
     if burn_rate_months < target_months:
         shortfall = max(0.0, target_months * expenses - savings)
-        alerts.append(Alert(
+        alerts.append(_AlertLite(
             user_email=profile.email,
             alert_type="emergency_fund_shortfall",
             severity="high" if burn_rate_months < target_months/2 else "medium",
             message=f"Emergency fund covers {burn_rate_months:.1f} months; target is {target_months} months.",
-            data={"shortfall": round(shortfall, 2), "target_months": target_months}
+            data={"shortfall": shortfall, "target_months": target_months}
         ))
 
     # Insurance coverage alerts
-    if not profile.insurance_health:
-        alerts.append(Alert(
-            user_email=profile.email,
-            alert_type="missing_health_insurance",
-            severity="high",
-            message="Health insurance not detected.",
-            data={}
-        ))
-    if not profile.insurance_renters:
-        alerts.append(Alert(
-            user_email=profile.email,
-            alert_type="missing_renters_insurance",
-            severity="medium",
-            message="Renter's/home insurance not detected.",
-            data={}
-        ))
-    if not profile.insurance_auto and total_debits > 0:
-        alerts.append(Alert(
-            user_email=profile.email,
-            alert_type="missing_auto_insurance",
-            severity="medium",
-            message="Auto insurance not detected.",
-            data={}
-        ))
-    if dependents > 0 and not profile.insurance_life:
-        alerts.append(Alert(
-            user_email=profile.email,
-            alert_type="missing_life_insurance",
-            severity="high",
-            message="Life insurance recommended when you have dependents.",
-            data={"dependents": dependents}
-        ))
+    missing = (
+        (not profile.insurance_health)
+        | (not profile.insurance_renters) << 1
+        | (not profile.insurance_auto) << 2
+        | (dependents > 0 and not profile.insurance_life) << 3
+    )
+    # Auto insurance is only flagged when there is spending to go with it
+    alert_mask = missing if total_debits > 0 else missing & ~_MISSING_AUTO_BIT
+    for bit, template in enumerate(_INSURANCE_TEMPLATES):
+        if alert_mask >> bit & 1:
+            data = {"dependents": dependents} if 1 << bit == _MISSING_LIFE_BIT else {}
+            alerts.append(_AlertLite(user_email=profile.email, data=data, **template))
 
     # Overspending vs income
     if income > 0 and total_debits > income * 1.1:
-        alerts.append(Alert(
+        alerts.append(_AlertLite(
             user_email=profile.email,
-            alert_type="overspending",
-            severity="medium",
-            message="Recent spending exceeds monthly income by more than 10%.",
-            data={"income": income, "spend": round(total_debits, 2)}
+            data={"income": income, "spend": total_debits},
+            **_OVERSPENDING
         ))
 
     # Budget adherence alerts when budgets are provided
@@ -139,12 +278,12 @@ def analyze_financial_protection(profile: FinancialProfile, transactions: List[T
         for cat, limit in profile.budgets.items():
             spent = category_totals.get(cat, 0.0)
             if limit and spent > limit:
-                alerts.append(Alert(
+                alerts.append(_AlertLite(
                     user_email=profile.email,
                     alert_type="budget_exceeded",
                     severity="low" if spent <= limit*1.1 else "medium",
                     message=f"Spending in {cat} is {spent:.2f} which exceeds your budget {limit:.2f}.",
-                    data={"category": cat, "spent": round(spent,2), "limit": limit}
+                    data={"category": cat, "spent": spent, "limit": limit}
                 ))
 
     # Score from 0-100 based on key pillars
@@ -152,28 +291,19 @@ def analyze_financial_protection(profile: FinancialProfile, transactions: List[T
     # Emergency fund weight
     score -= int(max(0, (target_months - burn_rate_months) / target_months) * 40)
     # Insurance coverage weight
-    missing_insurance = sum([
-        1 if not profile.insurance_health else 0,
-        1 if not profile.insurance_renters else 0,
-        1 if not profile.insurance_auto else 0,
-        1 if (dependents > 0 and not profile.insurance_life) else 0,
-    ])
-    score -= missing_insurance * 10
+    score -= missing.bit_count() * 10
     # Cash flow weight
-    if monthly_net < 0:
-        score -= 20
-    elif monthly_net < expenses * 0.1:
-        score -= 10
+    score -= 20 * (monthly_net < 0) + 10 * (0 <= monthly_net < expenses * 0.1)
 
     score = max(0, min(100, score))
 
     stats = {
         "monthly_income": income,
         "monthly_expenses": expenses,
-        "monthly_net": round(monthly_net, 2),
+        "monthly_net": monthly_net,
         "savings": savings,
-        "burn_rate_months": round(burn_rate_months, 2),
-        "total_spend": round(total_debits, 2)
+        "burn_rate_months": burn_rate_months,
+        "total_spend": total_debits
     }
 
     summary = (
@@ -182,45 +312,113 @@ def analyze_financial_protection(profile: FinancialProfile, transactions: List[T
         f"Generated {len(alerts)} alerts."
     )
 
-    return AnalysisResult(score=score, summary=summary, alerts=alerts, stats=stats)
+    return AnalysisResult(score=score, summary=summary, alerts=[a.to_alert() for a in alerts], stats=stats)
 
-# API endpoints
+# Helper: build the payload that is served, cached and persisted.
+# The analyzer keeps full precision; figures are rounded to cents once here, so
+# cache hits serve already-rounded data without touching them again.
 
-@app.post("/api/analyze", response_model=AnalysisResult)
-def analyze_finances(req: AnalysisRequest):
-    # Persist profile and transactions
+_ROUNDED_STATS = ("monthly_net", "burn_rate_months", "total_spend")
+# Rounded alert data fields, by the alert type that produces them
+_ROUNDED_ALERT_DATA = {
+    "emergency_fund_shortfall": ("shortfall",),
+    "overspending": ("spend",),
+    "budget_exceeded": ("spent",),
+}
+
+def present_analysis(result: AnalysisResult) -> dict:
+    payload = result.model_dump()
+    stats = payload["stats"]
+    for k in _ROUNDED_STATS:
+        stats[k] = round(stats[k], 2)
+    for alert in payload["alerts"]:
+        data = alert["data"]
+        for k in _ROUNDED_ALERT_DATA.get(alert["alert_type"], ()):
+            data[k] = round(data[k], 2)
+    return payload
+
+# Helper: memoize analysis payloads by request content
+# The cache is per process; with several uvicorn workers each keeps its own copy.
+
+ANALYSIS_CACHE_SIZE = 1024
+_analysis_cache: "OrderedDict[bytes, dict]" = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+def analysis_cache_key(req: AnalysisRequest) -> bytes:
+    payload = orjson.dumps(req.model_dump(), option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+def get_cached_analysis(key: bytes):
+    with _analysis_cache_lock:
+        payload = _analysis_cache.get(key)
+        if payload is not None:
+            _analysis_cache.move_to_end(key)
+        return payload
+
+def cache_analysis(key: bytes, payload: dict):
+    with _analysis_cache_lock:
+        _analysis_cache[key] = payload
+        _analysis_cache.move_to_end(key)
+        if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+
+# Helper: persist an analysis request and its result
+
+async def persist_analysis(req: AnalysisRequest, payload: dict, key: bytes):
+    persisted = True
     try:
-        create_document("financialprofile", req.profile)
-        for t in req.transactions:
-            create_document("transaction", t)
+        await create_document("financialprofile", req.profile)
+        await bulk_create_documents("transaction", req.transactions, flat=True)
     except Exception:
-        # Database may be unavailable; proceed without persistence
-        pass
-
-    result = analyze_financial_protection(req.profile, req.transactions)
+        # Database may be unavailable; the analysis was already returned
+        persisted = False
     try:
-        create_document("analysisresult", result)
-        for a in result.alerts:
-            create_document("alert", a)
+        await create_document("analysisresult", payload)
+        await bulk_create_documents("alert", payload["alerts"])
     except Exception:
-        pass
+        persisted = False
+
+    # Only cache once stored, so a resubmission after a failed write is persisted again
+    if persisted:
+        cache_analysis(key, payload)
+
+# API endpoints
+
+@app.post("/api/analyze", response_model=AnalysisResult)
+async def analyze_finances(req: AnalysisRequest, background_tasks: BackgroundTasks):
+    # Results are cached by persist_analysis only once both writes succeed, so a hit
+    # needs no persistence. Without a database, or while Mongo is down, nothing is
+    # cached and identical requests are recomputed every time.
+    key = analysis_cache_key(req)
+    cached = get_cached_analysis(key)
+    if cached is not None:
+        return ORJSONResponse(cached)
+
+    result = analyze_financial_protection(req.profile, req.transactions)
+    payload = present_analysis(result)
+    # Writes don't affect the response, so run them after it has been sent
+    background_tasks.add_task(persist_analysis, req, payload, key)
+
+    # Returning a Response directly skips FastAPI's response_model re-validation;
+    # response_model is kept for the OpenAPI schema only.
+    return ORJSONResponse(payload)
 
-    return result
+# Alert fields only; _id and the timestamps added by the database helpers are left on the server
+ALERT_PROJECTION = {"_id": 0, "created_at": 0, "updated_at": 0}
 
-@app.get("/api/alerts/{email}", response_model=List[Alert])
-def get_alerts(email: str):
+@app.get("/api/alerts/{email}", response_model=None)
+async def get_alerts(email: str):
     try:
-        docs = get_documents("alert", {"user_email": email})
-        # Convert to pydantic models
-        alerts = []
-        for d in docs:
-            d.pop("_id", None)
-            alerts.append(Alert(**d))
-        return alerts
+        # Documents were written by this service, so serialize them as-is without an Alert round-trip
+        cursor = get_documents_projected("alert", {"user_email": email}, ALERT_PROJECTION)
+        return ORJSONResponse(await cursor.to_list(length=None))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 2) * 2))
+    # Import string (not the app object) is required when workers > 1;
+    # "auto" picks uvloop/httptools when installed and falls back otherwise
+    uvicorn.run("main:app", host="0.0.0.0", port=port, loop="auto", http="auto", workers=workers)
@@ -0,0 +1,155 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+from fastapi import BackgroundTasks
+
+import main
+from schemas import AnalysisRequest, FinancialProfile, Transaction
+
+
+def make_transactions(n, seed=0):
+    rng = random.Random(seed)
+    categories = ["groceries", "rent", "travel", "", None]
+    return [
+        Transaction(
+            description=f"txn {i}",
+            category=rng.choice(categories),
+            amount=round(rng.uniform(-200, 500), 2),
+        )
+        for i in range(n)
+    ]
+
+
+def assert_same_totals(expected, actual):
+    exp_total, exp_cats = expected
+    total, cats = actual
+    assert total == pytest.approx(exp_total)
+    assert type(cats) is dict
+    assert cats == pytest.approx(exp_cats)
+
+
+def python_loop_totals(monkeypatch, transactions):
+    monkeypatch.setattr(main, "VECTORIZE_MIN_TRANSACTIONS", len(transactions))
+    return main.aggregate_spending(transactions)
+
+
+@pytest.mark.parametrize("n", [main.VECTORIZE_MIN_TRANSACTIONS, main.VECTORIZE_MIN_TRANSACTIONS + 1, 1000])
+def test_aggregate_spending_matches_across_threshold_and_kernels(monkeypatch, n):
+    transactions = make_transactions(n)
+    with monkeypatch.context() as m:
+        expected = python_loop_totals(m, transactions)
+
+    kernels = [main._sum_outflows_numpy, main._sum_outflows_loop]
+    if main.njit is not None:
+        kernels.append(main._sum_outflows)
+    for kernel in kernels:
+        with monkeypatch.context() as m:
+            m.setattr(main, "VECTORIZE_MIN_TRANSACTIONS", 0)
+            m.setattr(main, "_sum_outflows", kernel)
+            assert_same_totals(expected, main.aggregate_spending(transactions))
+
+    assert_same_totals(expected, main.aggregate_spending(transactions))
+
+
+def test_sum_outflows_kernel_and_warmup():
+    total, sums = main._sum_outflows(np.array([5.0, -2.0, 3.0]), np.array([1, 1, 0], dtype=np.int64), 2)
+    assert total == pytest.approx(8.0)
+    assert list(sums) == pytest.approx([3.0, 5.0])
+    main.warm_sum_outflows()
+
+
+INSURED = dict(insurance_health=True, insurance_renters=True, insurance_auto=True, insurance_life=True)
+UNINSURED = dict(insurance_health=False, insurance_renters=False, insurance_auto=False, insurance_life=False)
+
+
+def make_profile(**overrides):
+    fields = dict(
+        email="user@example.com",
+        monthly_income=5000,
+        monthly_expenses=3000,
+        savings=30000,
+        risk_tolerance="medium",
+        **INSURED,
+    )
+    fields.update(overrides)
+    return FinancialProfile(**fields)
+
+
+def spend(category, amount):
+    return Transaction(description=category, category=category, amount=amount)
+
+
+ANALYSIS_CASES = [
+    pytest.param({}, [], [], [], 100, id="healthy"),
+    pytest.param(
+        UNINSURED, [],
+        ["missing_health_insurance", "missing_renters_insurance"],
+        [{}, {}],
+        # auto still counts toward the score without spending, only its alert is skipped
+        70, id="uninsured-no-spending",
+    ),
+    pytest.param(
+        dict(UNINSURED, dependents=2), [spend("groceries", 100)],
+        ["missing_health_insurance", "missing_renters_insurance", "missing_auto_insurance", "missing_life_insurance"],
+        [{}, {}, {}, {"dependents": 2}],
+        60, id="uninsured-dependents-spending",
+    ),
+    pytest.param(dict(insurance_life=False), [], [], [], 100, id="life-without-dependents"),
+    pytest.param(dict(monthly_income=2000, savings=36000), [], [], [], 80, id="negative-net"),
+    pytest.param(dict(monthly_income=3000), [], [], [], 90, id="zero-net"),
+    pytest.param(dict(monthly_income=3100), [], [], [], 90, id="low-positive-net"),
+    pytest.param(
+        dict(monthly_income=1000, monthly_expenses=500, savings=1000, budgets={"groceries": 700, "rent": 500}),
+        [spend("groceries", 800.333), spend("rent", 400), spend("refund", -100)],
+        ["emergency_fund_shortfall", "overspending", "budget_exceeded"],
+        [
+            {"shortfall": 2000.0, "target_months": 6},
+            {"income": 1000.0, "spend": 1200.33},
+            {"category": "groceries", "spent": 800.33, "limit": 700.0},
+        ],
+        74, id="shortfall-overspending-budget",
+    ),
+]
+
+
+@pytest.mark.parametrize("overrides, transactions, alert_types, alert_data, score", ANALYSIS_CASES)
+def test_analyze_financial_protection(overrides, transactions, alert_types, alert_data, score):
+    result = main.analyze_financial_protection(make_profile(**overrides), transactions)
+    payload = main.present_analysis(result)
+
+    assert payload["score"] == score
+    assert [a["alert_type"] for a in payload["alerts"]] == alert_types
+    assert [a["data"] for a in payload["alerts"]] == alert_data
+    assert all(a["user_email"] == "user@example.com" for a in payload["alerts"])
+
+
+def test_analyze_finances_serves_persisted_result_from_cache(monkeypatch):
+    writes = []
+
+    async def fake_create_document(name, data):
+        writes.append(name)
+
+    async def fake_bulk_create_documents(name, docs, flat=False):
+        writes.append(name)
+
+    monkeypatch.setattr(main, "create_document", fake_create_document)
+    monkeypatch.setattr(main, "bulk_create_documents", fake_bulk_create_documents)
+    monkeypatch.setattr(main, "_analysis_cache", main.OrderedDict())
+
+    req = AnalysisRequest(profile=make_profile(**UNINSURED), transactions=[spend("groceries", 100)])
+
+    async def run():
+        first_tasks = BackgroundTasks()
+        first = await main.analyze_finances(req, first_tasks)
+        await first_tasks()
+        assert writes == ["financialprofile", "transaction", "analysisresult", "alert"]
+
+        second_tasks = BackgroundTasks()
+        second = await main.analyze_finances(req, second_tasks)
+        assert second_tasks.tasks == []
+        assert second.body == first.body
+
+    asyncio.run(run())
+    assert len(writes) == 4